@@ -6,16 +6,60 @@ Cross-platform implementation with focus on Windows compatibility
 
 import os
 import sys
-import json
-import shutil
-import hashlib
-import getpass
+import time
+import errno
+import struct
 import argparse
-from datetime import datetime
 from pathlib import Path
-import platform
+
+# Heavier modules are imported where they are used to keep CLI startup fast
+
+try:
+    import orjson  # optional, faster JSON
+except ImportError:
+    orjson = None
+
+# scrypt cost for new password hashes; setup calibrates n upwards from here
+SCRYPT_PARAMS = {'n': 2 ** 15, 'r': 8, 'p': 1}
+SCRYPT_MAX_N = 2 ** 18
+HASH_TARGET_SECONDS = 0.25
+
+# Hex digits of the fast pre-check hash kept next to each slow hash
+FAST_HASH_DIGITS = 1
+
+# Failed logins allowed before exponential backoff kicks in
+FREE_AUTH_ATTEMPTS = 3
+MAX_LOCKOUT_SECONDS = 300
+
+# Lock/unlock events logged before lock_status.json is rewritten
+LOCK_LOG_COMPACT_EVENTS = 256
+
+# Windows file attributes for the config directory
+FILE_ATTRIBUTE_HIDDEN = 0x02
+FILE_ATTRIBUTE_NOT_CONTENT_INDEXED = 0x2000
+
+# Files larger than this bypass the cache when copied across drives on Windows
+UNBUFFERED_COPY_MIN_SIZE = 4 * 1024 * 1024
+
+# Hashes written before the switch to scrypt carry no 'algo' field
+LEGACY_HASH = {'algo': 'pbkdf2_sha256', 'params': {'iterations': 100000}}
+
+# Binary hash file: magic, algo id, three cost parameters, salt, hash,
+# fast pre-check digit (0xFF if absent), reserved -- 96 bytes in total
+HASH_FILE_MAGIC = b'FLH1'
+HASH_FILE_FORMAT = struct.Struct('<4sIIII32s32sB11x')
+HASH_ALGO_IDS = {'pbkdf2_sha256': 1, 'scrypt': 2}
+HASH_ALGO_NAMES = {algo_id: algo for algo, algo_id in HASH_ALGO_IDS.items()}
+HASH_PARAM_NAMES = {'pbkdf2_sha256': ('iterations',), 'scrypt': ('n', 'r', 'p')}
+NO_FAST_HASH = 0xFF
+
+# The fast pre-check digits are packed into the single 'B' byte above
+assert FAST_HASH_DIGITS <= 2 and 16 ** FAST_HASH_DIGITS <= NO_FAST_HASH
 
 class FolderLock:
+    # Whether the console has been checked/switched to ANSI escape handling
+    _ansi_ready = False
+    
     def __init__(self):
         # Set up paths
         self.script_dir = Path(__file__).parent.absolute()
@@ -26,52 +70,669 @@ class FolderLock:
         self.config_dir.mkdir(exist_ok=True)
         self.hidden_dir.mkdir(exist_ok=True)
         
-        # Hide config directory on Windows
-        if platform.system() == 'Windows':
+        # Hide config directory on Windows (first run only; a marker records it)
+        hidden_marker = self.config_dir / '.hidden'
+        if sys.platform == 'win32' and not hidden_marker.exists():
             import ctypes
-            ctypes.windll.kernel32.SetFileAttributesW(
-                str(self.config_dir), 
-                ctypes.windll.kernel32.GetFileAttributesW(str(self.config_dir)) | 0x02
+            kernel32 = ctypes.windll.kernel32
+            hidden = kernel32.SetFileAttributesW(
+                str(self.config_dir),
+                FILE_ATTRIBUTE_HIDDEN | FILE_ATTRIBUTE_NOT_CONTENT_INDEXED
             )
+            # Keep the search indexer from walking freshly locked data
+            kernel32.SetFileAttributesW(str(self.hidden_dir),
+                                        FILE_ATTRIBUTE_NOT_CONTENT_INDEXED)
+            if hidden:
+                hidden_marker.touch()
         
         # Config files
-        self.admin_hash_file = self.config_dir / 'admin_hash.json'
-        self.user_hash_file = self.config_dir / 'user_hash.json'
+        self.admin_hash_file = self.config_dir / 'admin_hash.bin'
+        self.user_hash_file = self.config_dir / 'user_hash.bin'
         self.lock_status_file = self.config_dir / 'lock_status.json'
+        self.lock_status_log = self.config_dir / 'lock_status.log'
+        self.auth_cache_file = self.config_dir / 'auth_cache.json'
+        self.auth_failures_file = self.config_dir / 'auth_failures.json'
+        
+        # Parsed config files, read lazily at most once per run
+        self._lock_status_cache = None
+        self._lock_log_events = 0
+        self._hash_cache = {}
+        self._auth_failures = None
+        self._migrate_hash_files()
+        
+        # Short-lived verifier cache so consecutive commands skip the slow hash
+        self.auth_cache_ttl = 15 * 60  # seconds
+        self._auth_cache = self._load_auth_cache()
         
     def generate_salt(self):
         """Generate random salt for password hashing"""
         return os.urandom(32).hex()
     
-    def hash_password(self, password, salt=None):
+    def hash_password(self, password, salt=None, algo=None, params=None):
         """Hash password with salt"""
+        import hashlib
         if salt is None:
             salt = self.generate_salt()
         
-        # Use PBKDF2 for secure password hashing
-        hash_obj = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000  # iterations
-        )
+        if algo is None:
+            # New hashes: scrypt needs OpenSSL; other builds keep PBKDF2
+            if hasattr(hashlib, 'scrypt'):
+                algo = 'scrypt'
+                if params is None:
+                    params = self.hash_params()
+            else:
+                algo, params = LEGACY_HASH['algo'], LEGACY_HASH['params']
+        
+        if algo == 'scrypt':
+            # Memory-hard KDF: same defender latency, far costlier to brute-force
+            hash_obj = hashlib.scrypt(
+                password.encode('utf-8'),
+                salt=salt.encode('utf-8'),
+                n=params['n'],
+                r=params['r'],
+                p=params['p'],
+                maxmem=256 * params['r'] * params['n'] * params['p'],
+                dklen=32
+            )
+        elif algo == 'pbkdf2_sha256':
+            hash_obj = self.pbkdf2_sha256(
+                password.encode('utf-8'),
+                salt.encode('utf-8'),
+                params['iterations']
+            )
+        else:
+            raise ValueError(f"Unsupported password hash algorithm '{algo}'")
         
         return {
+            'algo': algo,
+            'params': params,
             'salt': salt,
-            'hash': hash_obj.hex()
+            'hash': hash_obj.hex(),
+            'fast': self.fast_hash(password, salt)
         }
     
+    def fast_hash(self, password, salt):
+        """Truncated single SHA-256, used to reject most wrong passwords cheaply
+        
+        A full fast hash would let anyone holding the hash file skip the slow
+        KDF altogether. Keeping one hex digit (4 bits) still turns away 15 of
+        16 wrong passwords instantly, while only cutting an offline attacker's
+        cost per guess by 16x (scrypt at ~250 ms stays above the old PBKDF2).
+        """
+        import hashlib
+        digest = hashlib.sha256((salt + password).encode('utf-8')).hexdigest()
+        return digest[:FAST_HASH_DIGITS]
+    
+    def pbkdf2_sha256(self, password, salt, iterations):
+        """PBKDF2-HMAC-SHA256 (32 bytes), avoiding hashlib's pure-Python fallback"""
+        import hashlib
+        # Without OpenSSL, hashlib's version is pure Python (<= 3.11) or absent
+        native = getattr(hashlib, 'pbkdf2_hmac', None)
+        if native is None or native.__module__ != '_hashlib':
+            # Use cryptography's OpenSSL binding if present
+            try:
+                from cryptography.hazmat.primitives import hashes
+                from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+            except ImportError:
+                pass
+            else:
+                kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32,
+                                 salt=salt, iterations=iterations)
+                return kdf.derive(password)
+        
+        if native is None:
+            raise RuntimeError("PBKDF2 is unavailable: install 'cryptography' "
+                               "or use a Python built with OpenSSL")
+        return native('sha256', password, salt, iterations)
+    
     def verify_password(self, password, stored_data):
         """Verify password against stored hash"""
-        result = self.hash_password(password, stored_data['salt'])
-        return result['hash'] == stored_data['hash']
+        import hmac
+        # Cheap pre-check first; hashes from older versions have none
+        if 'fast' in stored_data and not hmac.compare_digest(
+                self.fast_hash(password, stored_data['salt']), stored_data['fast']):
+            return False
+        
+        algo = stored_data.get('algo', LEGACY_HASH['algo'])
+        params = stored_data.get('params', LEGACY_HASH['params'])
+        result = self.hash_password(password, stored_data['salt'], algo, params)
+        # Constant-time compare of the raw digests
+        return hmac.compare_digest(bytes.fromhex(result['hash']),
+                                   bytes.fromhex(stored_data['hash']))
+    
+    def hash_params(self):
+        """scrypt parameters for new hashes, as calibrated during setup"""
+        try:
+            stored_hash = self._load_hash('admin')
+        except (OSError, ValueError):
+            return dict(SCRYPT_PARAMS)
+        
+        if stored_hash.get('algo') == 'scrypt':
+            return stored_hash['params']
+        return dict(SCRYPT_PARAMS)
+    
+    def check_openssl(self):
+        """Warn when hashing runs on an OpenSSL older than 3.0"""
+        try:
+            import ssl
+        except ImportError:
+            return
+        
+        # OpenSSL 3 picks SHA-NI/ARMv8 SHA-256 code paths automatically
+        if ssl.OPENSSL_VERSION_INFO < (3, 0, 0):
+            print(f"Note: {ssl.OPENSSL_VERSION} detected. Python linked against "
+                  "OpenSSL 3.0+ hashes faster on modern CPUs.")
+    
+    def calibrate_hash_params(self):
+        """Raise scrypt's n until one hash takes about HASH_TARGET_SECONDS"""
+        import hashlib
+        params = dict(SCRYPT_PARAMS)
+        if not hasattr(hashlib, 'scrypt'):
+            # New hashes fall back to PBKDF2, which ignores these
+            return params
+        
+        while params['n'] < SCRYPT_MAX_N:
+            start = time.perf_counter()
+            self.hash_password('calibration', algo='scrypt', params=params)
+            # Cost doubles with n: stop at the power of two nearest the target
+            if (time.perf_counter() - start) * 3 >= HASH_TARGET_SECONDS * 2:
+                break
+            params['n'] *= 2
+        return params
+    
+    def _hash_file(self, role):
+        """Path of the stored hash for 'admin' or 'user'"""
+        return self.admin_hash_file if role == 'admin' else self.user_hash_file
+    
+    def _parse_json(self, payload):
+        """Parse JSON bytes, using orjson when installed"""
+        if orjson is not None:
+            return orjson.loads(payload)
+        import json
+        return json.loads(payload)
+    
+    def _dump_json(self, data, indent=False):
+        """Serialize data to JSON bytes, using orjson when installed"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        import json
+        return json.dumps(data, indent=2 if indent else None).encode('utf-8')
+    
+    def _read_json(self, path):
+        """Parse a JSON file"""
+        return self._parse_json(path.read_bytes())
+    
+    def _write_json(self, path, data, indent=False, mode=0o666):
+        """Write data to a JSON file"""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._dump_json(data, indent))
+    
+    def _pack_hash(self, stored_hash):
+        """Encode a hash record in the fixed binary layout"""
+        algo = stored_hash['algo']
+        params = [stored_hash['params'][name] for name in HASH_PARAM_NAMES[algo]]
+        params += [0] * (3 - len(params))
+        salt = bytes.fromhex(stored_hash['salt'])
+        if len(salt) != 32:
+            raise ValueError("Password salt must be 32 bytes")
+        fast = stored_hash.get('fast')
+        
+        return HASH_FILE_FORMAT.pack(
+            HASH_FILE_MAGIC,
+            HASH_ALGO_IDS[algo],
+            *params,
+            salt,
+            bytes.fromhex(stored_hash['hash']),
+            NO_FAST_HASH if fast is None else int(fast, 16)
+        )
+    
+    def _unpack_hash(self, data):
+        """Decode a stored hash record, binary or JSON from older versions"""
+        if data[:1] == b'{':
+            stored_hash = self._parse_json(data)
+            stored_hash.setdefault('algo', LEGACY_HASH['algo'])
+            stored_hash.setdefault('params', LEGACY_HASH['params'])
+            return stored_hash
+        
+        try:
+            magic, algo_id, *params, salt, digest, fast = HASH_FILE_FORMAT.unpack_from(data)
+        except struct.error:
+            raise ValueError("Unrecognized password hash file") from None
+        algo = HASH_ALGO_NAMES.get(algo_id)
+        if magic != HASH_FILE_MAGIC or algo is None:
+            raise ValueError("Unrecognized password hash file")
+        
+        stored_hash = {
+            'algo': algo,
+            'params': dict(zip(HASH_PARAM_NAMES[algo], params)),
+            'salt': salt.hex(),
+            'hash': digest.hex()
+        }
+        if fast != NO_FAST_HASH:
+            stored_hash['fast'] = format(fast, f'0{FAST_HASH_DIGITS}x')
+        return stored_hash
+    
+    def _migrate_hash_files(self):
+        """Convert admin/user hashes from older JSON files to the binary layout"""
+        for role in ('admin', 'user'):
+            if self._hash_file(role).exists():
+                continue
+            legacy_file = self.config_dir / f'{role}_hash.json'
+            if legacy_file.exists():
+                self._save_hash(role, self._unpack_hash(legacy_file.read_bytes()))
+                legacy_file.unlink()
+    
+    def _load_hash(self, role):
+        """Load the stored hash for role, reading the file only once"""
+        if role not in self._hash_cache:
+            self._hash_cache[role] = self._unpack_hash(self._hash_file(role).read_bytes())
+        return self._hash_cache[role]
+    
+    def _save_hash(self, role, stored_hash):
+        """Persist a new hash for role and keep it cached"""
+        self._hash_file(role).write_bytes(self._pack_hash(stored_hash))
+        self._hash_cache[role] = stored_hash
+    
+    def _load_lock_status(self):
+        """Load lock status (snapshot plus event log), reading files only once"""
+        if self._lock_status_cache is None:
+            self._lock_status_cache = self._read_json(self.lock_status_file)
+            self._replay_lock_log()
+        return self._lock_status_cache
+    
+    def _replay_lock_log(self):
+        """Apply logged lock/unlock events on top of the loaded snapshot"""
+        try:
+            lines = self.lock_status_log.read_bytes().splitlines()
+        except FileNotFoundError:
+            return
+        
+        lock_status = self._lock_status_cache
+        torn = False
+        for line in lines:
+            try:
+                event = self._parse_json(line)
+            except ValueError:
+                torn = True
+                continue
+            
+            if event['op'] == 'lock':
+                lock_status[event['path']] = event['info']
+            elif event['op'] == 'unlock':
+                lock_status.pop(event['path'], None)
+            elif event['op'] == 'reset':
+                lock_status.clear()
+            self._lock_log_events += 1
+        
+        # An interrupted write left a partial line; start a clean log
+        if torn:
+            self._save_lock_status()
+    
+    def _append_lock_event(self, event):
+        """Append one event to the lock log, compacting it once it grows large"""
+        line = self._dump_json(event) + b'\n'
+        fd = os.open(self.lock_status_log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        
+        self._lock_log_events += 1
+        if self._lock_log_events >= LOCK_LOG_COMPACT_EVENTS:
+            self._save_lock_status()
+    
+    def _record_lock(self, folder_str, info):
+        """Mark folder_str as locked, logging a single event"""
+        self._load_lock_status()[folder_str] = info
+        self._append_lock_event({'op': 'lock', 'path': folder_str, 'info': info})
+    
+    def _record_unlock(self, folder_str):
+        """Mark folder_str as unlocked, logging a single event"""
+        del self._load_lock_status()[folder_str]
+        self._append_lock_event({'op': 'unlock', 'path': folder_str})
+    
+    def _reset_lock_status(self):
+        """Forget every lock (fresh setup), logging a single event"""
+        self._lock_status_cache = {}
+        self._append_lock_event({'op': 'reset'})
+        self._save_lock_status()
+    
+    def _save_lock_status(self):
+        """Atomically write a full lock status snapshot and reset the event log"""
+        tmp_file = self.lock_status_file.with_suffix('.tmp')
+        self._write_json(tmp_file, self._lock_status_cache, indent=True)
+        os.replace(tmp_file, self.lock_status_file)
+        
+        # Every change to the cache is logged first (lock/unlock/reset), so the
+        # snapshot equals the log applied to the previous snapshot. Replaying
+        # the log over it again gives the same state; a crash here is safe.
+        try:
+            self.lock_status_log.unlink()
+        except FileNotFoundError:
+            pass
+        self._lock_log_events = 0
+    
+    def _load_auth_cache(self):
+        """Load the verifier cache, dropping expired entries"""
+        try:
+            cache = self._read_json(self.auth_cache_file)
+        except (OSError, ValueError):
+            return {}
+        
+        now = time.time()
+        return {role: entry for role, entry in cache.items()
+                if isinstance(entry, dict) and entry.get('expires_at', 0) > now}
+    
+    def _save_auth_cache(self):
+        """Write the verifier cache readable by the owner only"""
+        self._write_json(self.auth_cache_file, self._auth_cache, mode=0o600)
+        # os.open's mode only applies when the file is first created
+        os.chmod(self.auth_cache_file, 0o600)
+    
+    def _dpapi(self, data, protect):
+        """Encrypt/decrypt data with the Windows user's DPAPI key"""
+        import ctypes
+        from ctypes import wintypes
+        
+        class DATA_BLOB(ctypes.Structure):
+            _fields_ = [('cbData', wintypes.DWORD),
+                        ('pbData', ctypes.POINTER(ctypes.c_char))]
+        
+        crypt32 = ctypes.WinDLL('crypt32', use_last_error=True)
+        buffer = ctypes.create_string_buffer(data, len(data))
+        blob_in = DATA_BLOB(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+        blob_out = DATA_BLOB()
+        func = crypt32.CryptProtectData if protect else crypt32.CryptUnprotectData
+        # CRYPTPROTECT_UI_FORBIDDEN: never prompt, fail instead
+        if not func(ctypes.byref(blob_in), None, None, None, None, 0x01,
+                    ctypes.byref(blob_out)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+        finally:
+            ctypes.windll.kernel32.LocalFree(blob_out.pbData)
+    
+    def _protect_key(self, key):
+        """Encode a cache key for storage, sealed with DPAPI on Windows"""
+        if sys.platform == 'win32':
+            key = self._dpapi(key, protect=True)
+        return key.hex()
+    
+    def _unprotect_key(self, stored_key):
+        """Recover a cache key written by _protect_key"""
+        key = bytes.fromhex(stored_key)
+        if sys.platform == 'win32':
+            key = self._dpapi(key, protect=False)
+        return key
+    
+    def _invalidate_auth_cache(self):
+        """Forget all cached verifiers (after a password change)"""
+        self._auth_cache = {}
+        try:
+            self.auth_cache_file.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def _load_auth_failures(self):
+        """Load failed-login counters, reading the file only once"""
+        if self._auth_failures is None:
+            try:
+                self._auth_failures = self._read_json(self.auth_failures_file)
+            except (OSError, ValueError):
+                self._auth_failures = {}
+        return self._auth_failures
+    
+    def _lockout_remaining(self, role):
+        """Seconds until role may try a password again (0 if not locked out)"""
+        entry = self._load_auth_failures().get(role)
+        if not entry:
+            return 0
+        return max(0, entry['lockout_until'] - time.time())
+    
+    def _record_auth_result(self, role, success):
+        """Reset the failure counter on success, back off exponentially on failure"""
+        failures = self._load_auth_failures()
+        if success:
+            if failures.pop(role, None) is None:
+                return
+        else:
+            entry = failures.setdefault(role, {'failures': 0, 'lockout_until': 0})
+            entry['failures'] += 1
+            if entry['failures'] >= FREE_AUTH_ATTEMPTS:
+                delay = min(2 ** (entry['failures'] - FREE_AUTH_ATTEMPTS),
+                            MAX_LOCKOUT_SECONDS)
+                entry['lockout_until'] = time.time() + delay
+        
+        try:
+            self._write_json(self.auth_failures_file, failures)
+        except OSError:
+            pass
+    
+    def _verify_cached(self, role, password, stored_data):
+        """Verify password, using a fast keyed hash while the cache is fresh
+        
+        The first successful login pays for the slow hash (scrypt, or PBKDF2
+        for older hashes); for the next auth_cache_ttl seconds a keyed
+        BLAKE2b of the password is accepted instead. Anyone who can read
+        both the digest and its key gets a fast guessing oracle while the
+        entry is live, so the key is sealed with DPAPI on Windows, the file
+        is chmod 0600 elsewhere, and entries expire quickly.
+        """
+        import hashlib
+        import hmac
+        entry = self._auth_cache.get(role)
+        # Entries only count for the stored hash they were made against
+        if (entry and entry['expires_at'] > time.time()
+                and entry.get('salt') == stored_data['salt']):
+            try:
+                key = self._unprotect_key(entry['key'])
+            except (OSError, ValueError):
+                key = None
+            if key is not None:
+                fast = hashlib.blake2b(password.encode('utf-8'), key=key).hexdigest()
+                if hmac.compare_digest(fast, entry['hash']):
+                    return True
+        
+        if not self.verify_password(password, stored_data):
+            return False
+        
+        key = os.urandom(32)
+        try:
+            self._auth_cache[role] = {
+                'key': self._protect_key(key),
+                'hash': hashlib.blake2b(password.encode('utf-8'), key=key).hexdigest(),
+                'salt': stored_data['salt'],
+                'expires_at': time.time() + self.auth_cache_ttl
+            }
+            self._save_auth_cache()
+        except OSError:
+            pass
+        return True
+    
+    def move_item(self, src, target):
+        """Move src to target, as a plain rename when on the same filesystem"""
+        import shutil
+        if os.path.lexists(target):
+            raise FileExistsError(f"'{target}' already exists")
+        
+        try:
+            os.replace(src, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Different filesystem: fall back to copy + delete
+            shutil.move(src, target, copy_function=self.copy_file)
+    
+    def copy_file(self, src, dst):
+        """copy_function for cross-device moves that leaves the data copy to the OS"""
+        import shutil
+        if sys.platform != 'win32':
+            # shutil already copies via sendfile()/fcopyfile() here
+            return shutil.copy2(src, dst)
+        
+        import ctypes
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        flags = 0
+        if os.path.getsize(src) > UNBUFFERED_COPY_MIN_SIZE:
+            flags |= 0x1000  # COPY_FILE_NO_BUFFERING
+        if not kernel32.CopyFileExW(str(src), str(dst), None, None, None, flags):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return dst
+    
+    def move_contents(self, src_dir, dest_dir, action):
+        """Move every item of src_dir into dest_dir, returning how many moved"""
+        # Plain strings from scandir; no Path object per item
+        dest = str(dest_dir)
+        with os.scandir(src_dir) as entries:
+            items = [(entry.name, entry.path) for entry in entries]
+        
+        if len(items) > 1 and os.stat(src_dir).st_dev != os.stat(dest_dir).st_dev:
+            # Cross-device moves copy file data; overlap the I/O across files
+            from concurrent.futures import ThreadPoolExecutor
+            workers = min(8, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    (name, pool.submit(self.move_item, path, os.path.join(dest, name)))
+                    for name, path in items
+                ]
+                outcomes = [(name, future.exception()) for name, future in futures]
+        else:
+            outcomes = []
+            for name, path in items:
+                try:
+                    self.move_item(path, os.path.join(dest, name))
+                    outcomes.append((name, None))
+                except Exception as e:
+                    outcomes.append((name, e))
+        
+        items_moved = 0
+        for name, error in outcomes:
+            if error is None:
+                items_moved += 1
+            else:
+                print(f"Warning: Could not {action} {name}: {error}")
+        return items_moved
+    
+    def is_link(self, path):
+        """True for symlinks and Windows junctions, which rename as the link itself"""
+        if os.path.islink(path):
+            return True
+        if sys.platform == 'win32':
+            # FILE_ATTRIBUTE_REPARSE_POINT covers junctions as well as symlinks
+            try:
+                return bool(os.lstat(path).st_file_attributes & 0x400)
+            except OSError:
+                return False
+        return False
+    
+    def same_device(self, path, other):
+        """True if path and other exist on the same filesystem"""
+        try:
+            return os.stat(path).st_dev == os.stat(other).st_dev
+        except OSError:
+            return False
+    
+    def count_items(self, path):
+        """Number of entries in path for display, or '?' if it cannot be listed"""
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            return '?'
+    
+    def hide_folder(self, folder, hidden_path):
+        """Move folder's contents to hidden_path
+        
+        Returns (item count, whether the folder itself was renamed).
+        """
+        import shutil
+        # os.replace would silently take over an existing empty directory
+        if os.path.lexists(hidden_path):
+            raise FileExistsError(f"'{hidden_path}' already exists")
+        
+        # Whole folder in one rename, then leave an empty folder in its place.
+        # A link would move only itself, leaving the target's files visible.
+        if not self.is_link(folder):
+            try:
+                os.replace(folder, hidden_path)
+            except OSError:
+                pass
+            else:
+                # The data has moved: from here on, never fail without undoing it
+                try:
+                    folder.mkdir()
+                except OSError:
+                    os.replace(hidden_path, folder)
+                    raise
+                try:
+                    shutil.copystat(hidden_path, folder)
+                except OSError:
+                    pass  # placeholder keeps default permissions
+                return self.count_items(hidden_path), True
+        
+        # Link, cross-device or folder in use: move item by item
+        hidden_path.mkdir()
+        return self.move_contents(folder, hidden_path, 'move'), False
+    
+    def restore_folder(self, hidden_path, folder, renamed=False):
+        """Move hidden_path's contents back into folder, returning the item count
+        
+        renamed says whether hide_folder renamed the folder itself; only then
+        is the folder at the original path an empty placeholder of ours.
+        """
+        import shutil
+        # Swap the whole folder back only when the rename can work, so the
+        # original folder (permissions, ACLs, owner) is never deleted for a merge.
+        # Never touch user data or a link.
+        if (renamed and not self.is_link(folder)
+                and self.same_device(hidden_path, folder.parent)):
+            emptied = True
+            try:
+                os.rmdir(folder)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Placeholder gained files while locked: merge below
+                emptied = False
+            
+            if emptied:
+                try:
+                    os.replace(hidden_path, folder)
+                except OSError:
+                    # hidden_path is the original folder: restore its metadata
+                    folder.mkdir(exist_ok=True)
+                    shutil.copystat(hidden_path, folder)
+                else:
+                    return self.count_items(folder)
+        
+        # Not renamed whole, gained new files, or another device: merge item by item
+        folder.mkdir(exist_ok=True)
+        return self.move_contents(hidden_path, folder, 'restore')
     
     def clear_screen(self):
         """Clear terminal screen"""
-        os.system('cls' if platform.system() == 'Windows' else 'clear')
+        if not FolderLock._ansi_ready:
+            if sys.platform == 'win32':
+                self._enable_vt_mode()
+            FolderLock._ansi_ready = True
+        
+        # Escape codes instead of spawning a 'cls'/'clear' process
+        sys.stdout.write('\x1b[2J\x1b[H')
+        sys.stdout.flush()
+    
+    def _enable_vt_mode(self):
+        """Turn on VT100 escape processing in the Windows console"""
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
     
     def initial_setup(self):
         """Initial setup for the tool"""
+        import getpass
         self.clear_screen()
         print("=== Folder Lock Tool Setup ===\n")
         
@@ -108,16 +769,18 @@ class FolderLock:
                 continue
             break
         
-        # Save password hashes
-        with open(self.admin_hash_file, 'w') as f:
-            json.dump(self.hash_password(admin_pass), f)
+        # Tune hashing cost to this machine; stored with each hash
+        print("\nCalibrating password hashing...")
+        self.check_openssl()
+        params = self.calibrate_hash_params()
         
-        with open(self.user_hash_file, 'w') as f:
-            json.dump(self.hash_password(user_pass), f)
+        # Save password hashes
+        self._save_hash('admin', self.hash_password(admin_pass, params=params))
+        self._save_hash('user', self.hash_password(user_pass, params=params))
+        self._invalidate_auth_cache()
         
         # Initialize lock status
-        with open(self.lock_status_file, 'w') as f:
-            json.dump({}, f)
+        self._reset_lock_status()
         
         print("\n✓ Setup complete!")
         print("You can now use 'lock' and 'unlock' commands.")
@@ -125,16 +788,24 @@ class FolderLock:
     
     def authenticate_user(self):
         """Authenticate user with password"""
+        import getpass
         if not self.user_hash_file.exists():
             print("Error: System not configured. Run --setup first.")
             return False
         
-        with open(self.user_hash_file, 'r') as f:
-            stored_hash = json.load(f)
+        # Refuse outright while backing off, without hashing anything
+        remaining = self._lockout_remaining('user')
+        if remaining:
+            print(f"Too many failed attempts. Try again in {int(remaining) + 1}s.")
+            return False
+        
+        stored_hash = self._load_hash('user')
         
         password = getpass.getpass("Enter user password: ")
         
-        if self.verify_password(password, stored_hash):
+        verified = self._verify_cached('user', password, stored_hash)
+        self._record_auth_result('user', verified)
+        if verified:
             return True
         else:
             print("Authentication failed!")
@@ -142,16 +813,24 @@ class FolderLock:
     
     def authenticate_admin(self):
         """Authenticate admin with password"""
+        import getpass
         if not self.admin_hash_file.exists():
             print("Error: System not configured. Run --setup first.")
             return False
         
-        with open(self.admin_hash_file, 'r') as f:
-            stored_hash = json.load(f)
+        # Refuse outright while backing off, without hashing anything
+        remaining = self._lockout_remaining('admin')
+        if remaining:
+            print(f"Too many failed attempts. Try again in {int(remaining) + 1}s.")
+            return False
+        
+        stored_hash = self._load_hash('admin')
         
         password = getpass.getpass("Enter admin password: ")
         
-        if self.verify_password(password, stored_hash):
+        verified = self._verify_cached('admin', password, stored_hash)
+        self._record_auth_result('admin', verified)
+        if verified:
             print("✓ Admin mode activated\n")
             return True
         else:
@@ -176,8 +855,7 @@ class FolderLock:
             return False
         
         # Load lock status
-        with open(self.lock_status_file, 'r') as f:
-            lock_status = json.load(f)
+        lock_status = self._load_lock_status()
         
         folder_str = str(folder)
         
@@ -187,29 +865,49 @@ class FolderLock:
             return False
         
         # Create hidden directory for this folder
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        locked_at = int(time.time())
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(locked_at))
         hidden_name = f"{folder.name}_{timestamp}"
         hidden_path = self.hidden_dir / hidden_name
-        hidden_path.mkdir()
+        
+        # Same-named folders locked within one second need distinct slots
+        suffix = 1
+        while os.path.lexists(hidden_path):
+            suffix += 1
+            hidden_path = self.hidden_dir / f"{hidden_name}_{suffix}"
         
         # Move all contents to hidden location
-        items_moved = 0
-        for item in folder.iterdir():
-            try:
-                shutil.move(str(item), str(hidden_path))
-                items_moved += 1
-            except Exception as e:
-                print(f"Warning: Could not move {item.name}: {e}")
+        items_moved, renamed = self.hide_folder(folder, hidden_path)
         
-        # Update lock status
-        lock_status[folder_str] = {
-            'hidden_path': str(hidden_path),
-            'locked_at': datetime.now().isoformat(),
-            'items_count': items_moved
-        }
+        # A renamed folder keeps its own attributes rather than inheriting
+        # .locked_data's, so flag it for the search indexer explicitly
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            # Default c_int restype: INVALID_FILE_ATTRIBUTES comes back as -1
+            attributes = kernel32.GetFileAttributesW(str(hidden_path)) & 0xFFFFFFFF
+            if attributes != 0xFFFFFFFF:
+                kernel32.SetFileAttributesW(
+                    str(hidden_path),
+                    attributes | FILE_ATTRIBUTE_NOT_CONTENT_INDEXED
+                )
         
-        with open(self.lock_status_file, 'w') as f:
-            json.dump(lock_status, f, indent=2)
+        # Update lock status; without a record the data could never be restored
+        try:
+            self._record_lock(folder_str, {
+                'hidden_path': str(hidden_path),
+                'locked_at': locked_at,
+                'items_count': items_moved,
+                'renamed': renamed
+            })
+        except Exception:
+            self._load_lock_status().pop(folder_str, None)
+            self.restore_folder(hidden_path, folder, renamed)
+            try:
+                os.rmdir(hidden_path)
+            except OSError:
+                pass
+            raise
         
         print(f"✓ Folder '{folder_path}' has been locked successfully.")
         print(f"  {items_moved} items hidden.")
@@ -224,8 +922,7 @@ class FolderLock:
             return False
         
         # Load lock status
-        with open(self.lock_status_file, 'r') as f:
-            lock_status = json.load(f)
+        lock_status = self._load_lock_status()
         
         folder_str = str(folder)
         
@@ -235,35 +932,25 @@ class FolderLock:
             return False
         
         # Get hidden path
-        hidden_path = Path(lock_status[folder_str]['hidden_path'])
+        info = lock_status[folder_str]
+        hidden_path = Path(info['hidden_path'])
         
         if not hidden_path.exists():
             print("Error: Hidden data not found. The folder might have been corrupted.")
             return False
         
-        # Create folder if it doesn't exist
-        folder.mkdir(exist_ok=True)
-        
         # Restore contents
-        items_restored = 0
-        for item in hidden_path.iterdir():
-            try:
-                shutil.move(str(item), str(folder))
-                items_restored += 1
-            except Exception as e:
-                print(f"Warning: Could not restore {item.name}: {e}")
+        items_restored = self.restore_folder(hidden_path, folder,
+                                             info.get('renamed', False))
         
-        # Remove hidden directory
+        # Remove hidden directory (already gone if renamed back whole)
         try:
-            hidden_path.rmdir()
-        except:
+            os.rmdir(hidden_path)
+        except OSError:
             pass
         
         # Remove from lock status
-        del lock_status[folder_str]
-        
-        with open(self.lock_status_file, 'w') as f:
-            json.dump(lock_status, f, indent=2)
+        self._record_unlock(folder_str)
         
         print(f"✓ Folder '{folder_path}' has been unlocked successfully.")
         print(f"  {items_restored} items restored.")
@@ -271,6 +958,7 @@ class FolderLock:
     
     def change_user_password(self):
         """Change user password (admin function)"""
+        import getpass
         print("=== Change User Password ===")
         
         while True:
@@ -287,13 +975,14 @@ class FolderLock:
             break
         
         # Save new password hash
-        with open(self.user_hash_file, 'w') as f:
-            json.dump(self.hash_password(new_pass), f)
+        self._save_hash('user', self.hash_password(new_pass))
+        self._invalidate_auth_cache()
         
         print("✓ User password changed successfully.")
     
     def change_admin_password(self):
         """Change admin password"""
+        import getpass
         print("=== Change Admin Password ===")
         
         while True:
@@ -310,8 +999,8 @@ class FolderLock:
             break
         
         # Save new password hash
-        with open(self.admin_hash_file, 'w') as f:
-            json.dump(self.hash_password(new_pass), f)
+        self._save_hash('admin', self.hash_password(new_pass))
+        self._invalidate_auth_cache()
         
         print("✓ Admin password changed successfully.")
     
@@ -319,18 +1008,21 @@ class FolderLock:
         """Show all locked folders"""
         print("=== Locked Folders Status ===\n")
         
-        with open(self.lock_status_file, 'r') as f:
-            lock_status = json.load(f)
+        lock_status = self._load_lock_status()
         
         if not lock_status:
             print("No folders are currently locked.")
             return
         
-        print(f"{'Folder Path':<50} {'Locked At':<20} {'Items':<10}")
-        print("-" * 80)
+        rows = [f"{'Folder Path':<50} {'Locked At':<20} {'Items':<10}", "-" * 80]
         
         for folder, info in lock_status.items():
-            locked_at = datetime.fromisoformat(info['locked_at']).strftime("%Y-%m-%d %H:%M")
+            locked_at = info['locked_at']
+            if isinstance(locked_at, str):
+                # Entries written by older versions store an ISO timestamp
+                from datetime import datetime
+                locked_at = datetime.fromisoformat(locked_at).timestamp()
+            locked_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(locked_at))
             items = info['items_count']
             
             # Truncate long paths for display
@@ -338,7 +1030,9 @@ class FolderLock:
             if len(display_path) > 47:
                 display_path = "..." + display_path[-44:]
             
-            print(f"{display_path:<50} {locked_at:<20} {items:<10}")
+            rows.append(f"{display_path:<50} {locked_at:<20} {items:<10}")
+        
+        sys.stdout.write('\n'.join(rows) + '\n')
     
     def unlock_all_folders(self):
         """Emergency unlock all folders"""
@@ -350,8 +1044,7 @@ class FolderLock:
             print("Operation cancelled.")
             return
         
-        with open(self.lock_status_file, 'r') as f:
-            lock_status = json.load(f)
+        lock_status = self._load_lock_status()
         
         unlocked_count = 0
         for folder_str, info in lock_status.copy().items():
@@ -360,24 +1053,56 @@ class FolderLock:
                 hidden_path = Path(info['hidden_path'])
                 
                 if hidden_path.exists():
-                    folder.mkdir(exist_ok=True)
+                    self.restore_folder(hidden_path, folder, info.get('renamed', False))
                     
-                    for item in hidden_path.iterdir():
-                        shutil.move(str(item), str(folder))
-                    
-                    hidden_path.rmdir()
+                    try:
+                        os.rmdir(hidden_path)
+                    except FileNotFoundError:
+                        pass
                 
-                del lock_status[folder_str]
+                self._record_unlock(folder_str)
                 unlocked_count += 1
                 print(f"Unlocked: {folder_str}")
             except Exception as e:
                 print(f"Error unlocking {folder_str}: {e}")
         
-        with open(self.lock_status_file, 'w') as f:
-            json.dump(lock_status, f, indent=2)
+        self._save_lock_status()
         
         print(f"\n✓ {unlocked_count} folders unlocked.")
     
+    def exclude_from_antivirus(self):
+        """Exclude locked data from Windows Defender scans (admin function)"""
+        print("=== Antivirus Exclusion ===")
+        
+        if sys.platform != 'win32':
+            print("This command is only available on Windows.")
+            return
+        
+        print(f"Windows Defender will stop scanning '{self.hidden_dir}'.")
+        print("Locks and unlocks get faster, but malware inside locked folders")
+        print("will not be detected until the folder is unlocked.")
+        
+        confirmation = input("Are you sure? (yes/no): ")
+        if confirmation.lower() != 'yes':
+            print("Operation cancelled.")
+            return
+        
+        import subprocess
+        path = str(self.hidden_dir).replace("'", "''")
+        result = subprocess.run(
+            ['powershell', '-NoProfile', '-NonInteractive', '-Command',
+             f"Add-MpPreference -ExclusionPath '{path}'"],
+            capture_output=True,
+            text=True
+        )
+        
+        if result.returncode != 0:
+            print(f"Error: {result.stderr.strip() or 'Add-MpPreference failed'}")
+            print("Run this command from an elevated (Administrator) prompt.")
+            return
+        
+        print("✓ Locked data excluded from antivirus scans.")
+    
     def admin_mode(self, args):
         """Handle admin mode commands"""
         if not self.authenticate_admin():
@@ -391,12 +1116,15 @@ class FolderLock:
             self.show_lock_status()
         elif args.admin_command == 'unlock-all':
             self.unlock_all_folders()
+        elif args.admin_command == 'av-exclude':
+            self.exclude_from_antivirus()
         else:
             print("Available admin commands:")
             print("  change-pass    - Change user password")
             print("  change-admin   - Change admin password")
             print("  status        - Show all locked folders")
             print("  unlock-all    - Emergency unlock all folders")
+            print("  av-exclude    - Exclude locked data from Defender scans (Windows)")
 
 
 def main():
@@ -425,7 +1153,7 @@ def main():
     admin_parser.add_argument(
         'admin_command',
         nargs='?',
-        choices=['change-pass', 'change-admin', 'status', 'unlock-all'],
+        choices=['change-pass', 'change-admin', 'status', 'unlock-all', 'av-exclude'],
         help='Admin command to execute'
     )
     